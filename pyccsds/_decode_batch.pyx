@@ -0,0 +1,70 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled C version of `pyccsds._fast.decode_batch`."""
+
+from libc.stdint cimport int8_t, int32_t, int64_t, uint64_t
+
+__author__ = "Joey Mukherjee <joey@swri.org>"
+
+# Data type codes, these must match pyccsds._fast.
+cdef enum:
+    UINT = 0
+    INT = 1
+
+
+def decode_batch(
+    const unsigned char[::1] buf,
+    const Py_ssize_t[::1] offsets,
+    const int32_t[::1] start,
+    const int32_t[::1] nbytes,
+    const int32_t[::1] shift,
+    const uint64_t[::1] mask,
+    const int32_t[::1] bit_length,
+    const int8_t[::1] code,
+    uint64_t[:, ::1] out,
+):
+    """Extract the fields of many packets into an (N, nfields) uint64 array.
+
+    See `pyccsds._fast.decode_batch` for the parameters.
+    """
+
+    cdef Py_ssize_t i, j, b, first
+    cdef Py_ssize_t size = buf.shape[0]
+    cdef uint64_t val, byte
+    cdef int unused
+
+    with nogil:
+        for i in range(offsets.shape[0]):
+            for j in range(start.shape[0]):
+                first = offsets[i] + start[j]
+
+                if first + 8 <= size:
+                    # the compiler turns this fixed 8 byte big-endian load
+                    # into a single load and byte swap, the bytes after the
+                    # field are then shifted away
+                    val = (
+                        (<uint64_t>buf[first] << 56)
+                        | (<uint64_t>buf[first + 1] << 48)
+                        | (<uint64_t>buf[first + 2] << 40)
+                        | (<uint64_t>buf[first + 3] << 32)
+                        | (<uint64_t>buf[first + 4] << 24)
+                        | (<uint64_t>buf[first + 5] << 16)
+                        | (<uint64_t>buf[first + 6] << 8)
+                        | <uint64_t>buf[first + 7]
+                    )
+                    val >>= 8 * (8 - nbytes[j])
+                else:
+                    # too close to the end of the buffer, read byte by byte
+                    val = 0
+                    for b in range(nbytes[j]):
+                        byte = 0
+                        if first + b < size:
+                            byte = buf[first + b]
+                        val = (val << 8) | byte
+
+                if code[j] == UINT or code[j] == INT:
+                    val = (val >> shift[j]) & mask[j]
+                    if code[j] == INT:
+                        unused = 64 - bit_length[j]
+                        val = <uint64_t>((<int64_t>(val << unused)) >> unused)
+
+                out[i, j] = val
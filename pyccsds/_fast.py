@@ -0,0 +1,90 @@
+"""Compiled kernels for the internal decoding routines.
+
+`decode_batch` is the C extension built from ``_decode_batch.pyx`` when it
+was compiled, otherwise the numba kernel below when the optional numba
+package is installed, otherwise None and the decoder falls back to plain
+NumPy.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
+__author__ = "Joey Mukherjee <joey@swri.org>"
+
+# Codes for the data types of the fields, as passed to the kernels.
+UINT, INT, FLOAT, FILL, STR = range(5)
+
+DATA_TYPE_CODES = {"uint": UINT, "int": INT, "float": FLOAT, "fill": FILL, "str": STR}
+
+
+def _decode_batch(buf, offsets, start, nbytes, shift, mask, bit_length, code, out):
+    """Extract the fields of many packets into an (N, nfields) uint64 array.
+
+    Parameters
+    ----------
+    buf : array
+       A NumPy array of uint8 type, holding the bytes of the file to decode.
+    offsets : array of int
+       The byte offset of the start of each packet in `buf`.
+    start, nbytes, shift, bit_length : array of int32
+       The field metadata: the first byte of each field within the packet,
+       the number of bytes it spans (at most 8), the right shift to apply
+       to those bytes and the length of the field in bits.
+    mask : array of uint64
+       The mask selecting the bits of each field once shifted.
+    code : array of int8
+       The data type code of each field.
+    out : array
+       A NumPy array of uint64 type and shape (N, nfields) to fill in.
+       Signed fields are stored as their two's complement bit pattern.
+    """
+
+    for i in prange(offsets.shape[0]):
+        for j in range(start.shape[0]):
+            first = offsets[i] + start[j]
+
+            if first + 8 <= buf.shape[0]:
+                # LLVM turns this fixed 8 byte big-endian load into a single
+                # load and byte swap, the bytes after the field are then
+                # shifted away
+                val = (
+                    (np.uint64(buf[first]) << np.uint64(56))
+                    | (np.uint64(buf[first + 1]) << np.uint64(48))
+                    | (np.uint64(buf[first + 2]) << np.uint64(40))
+                    | (np.uint64(buf[first + 3]) << np.uint64(32))
+                    | (np.uint64(buf[first + 4]) << np.uint64(24))
+                    | (np.uint64(buf[first + 5]) << np.uint64(16))
+                    | (np.uint64(buf[first + 6]) << np.uint64(8))
+                    | np.uint64(buf[first + 7])
+                )
+                val >>= np.uint64(8 * (8 - nbytes[j]))
+            else:
+                # too close to the end of the buffer, read byte by byte
+                val = np.uint64(0)
+                for b in range(nbytes[j]):
+                    byte = np.uint64(0)
+                    if first + b < buf.shape[0]:
+                        byte = np.uint64(buf[first + b])
+                    val = (val << np.uint64(8)) | byte
+
+            if code[j] == UINT or code[j] == INT:
+                val = (val >> np.uint64(shift[j])) & mask[j]
+                if code[j] == INT:
+                    unused = np.uint64(64 - bit_length[j])
+                    val = np.uint64(np.int64(val << unused) >> np.int64(unused))
+
+            out[i, j] = val
+
+
+try:
+    from ._decode_batch import decode_batch
+except ImportError:
+    if njit is not None:
+        decode_batch = njit(parallel=True, cache=True)(_decode_batch)
+    else:
+        decode_batch = None
@@ -1,16 +1,111 @@
 """Internal decoding routines."""
 from __future__ import division
-from collections import namedtuple, OrderedDict
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 
+from ._fast import DATA_TYPE_CODES, decode_batch
+
 __author__ = "Joey Mukherjee <joey@swri.org>"
 
 # lots of this is based on ccsdspy from Daniel DaSilva but the bugs are mine!
 
+# JM - the number of actual bytes in memory a variable takes up after all the
+# masking is done, indexed by the number of bytes it spans in the file
+_NBYTES_FINAL = (0, 1, 2, 4, 4, 8, 8, 8, 8)
+
+# The dtype of each data type in batches of decoded packets. Fields spanning
+# more than 8 bytes are kept as Python ints in object arrays instead.
+_BATCH_DTYPES = {
+    "uint": np.uint64,
+    "int": np.int64,
+    "fill": np.uint64,
+    "float": np.float64,
+    "str": np.uint64,
+}
+
+
+class FieldMeta(object):
+    """
+    The metadata of the fields of a packet, stored as parallel arrays.
+
+    Every array holds one entry per field, in the order of the packet
+    definition, so that whole columns of fields can be handed to NumPy and
+    to the compiled kernels.
+
+    Attributes
+    ----------
+    start : array of int32
+        The byte of the packet each field starts in.
+    nbytes : array of int32
+        The number of bytes each field takes up in the file.
+    nbytes_final : array of int32
+        The number of bytes each field takes up in memory once decoded.
+    bit_offset : array of int32
+        The bit offset of each field.
+    bit_length : array of int32
+        The number of bits of each field.
+    shift : array of int32
+        The right shift that moves each field to the bottom of its bytes.
+    mask : array of uint64
+        The mask selecting the bits of each field once shifted, for the
+        kernels. It is capped at 64 bits, wider fields are masked with
+        Python ints instead.
+    aligned : array of bool
+        Whether each field fills whole bytes exactly, so that the shift and
+        mask are no-ops.
+    code : array of int8
+        The data type code of each field, see `pyccsds._fast`.
+    nbits : int
+        The number of bits of the packet the fields take up.
+    """
+
+    __slots__ = (
+        "start",
+        "nbytes",
+        "nbytes_final",
+        "bit_offset",
+        "bit_length",
+        "shift",
+        "mask",
+        "aligned",
+        "code",
+        "nbits",
+    )
+
+    def __init__(
+        self,
+        start,
+        nbytes,
+        nbytes_final,
+        bit_offset,
+        bit_length,
+        code,
+        nbits,
+    ):
+        self.start = np.array(start, dtype=np.int32)
+        self.nbytes = np.array(nbytes, dtype=np.int32)
+        self.nbytes_final = np.array(nbytes_final, dtype=np.int32)
+        self.bit_offset = np.array(bit_offset, dtype=np.int32)
+        self.bit_length = np.array(bit_length, dtype=np.int32)
+        self.shift = self.nbytes * 8 - (self.bit_offset + self.bit_length)
+        self.mask = np.uint64(0xFFFFFFFFFFFFFFFF) >> (
+            64 - np.minimum(self.bit_length, 64)
+        ).astype(np.uint64)
+        self.aligned = (self.shift == 0) & (self.bit_length == self.nbytes * 8)
+        self.code = np.array(code, dtype=np.int8)
+        self.nbits = nbits
+
 
 def _create_field_meta(packet_nbytes, fields):
-    body_nbytes = sum(field._bit_length for field in fields) // 8
-    counter = (packet_nbytes - body_nbytes) * 8
+
+    # packet_nbytes is None when every field has a bit_offset, the counter is
+    # then set by the first field
+    if packet_nbytes is None:
+        counter = 0
+    else:
+        body_nbytes = sum(field._bit_length for field in fields) // 8
+        counter = (packet_nbytes - body_nbytes) * 8
     bit_offset = {}
 
     for i, field in enumerate(fields):
@@ -46,68 +141,156 @@ def _create_field_meta(packet_nbytes, fields):
         assert counter == packet_nbytes * 8, "Field definition != packet length".format(
             n=counter - packet_nbytes * 8
         )
-    elif counter > packet_nbytes * 8:
-        raise RuntimeError(
-            ("Packet definition larger than packet length" " by {} bits").format(
-                counter - (packet_nbytes * 8)
-            )
-        )
 
     # Setup metadata for each field, consiting of where to look for the field in
     # the file and how to parse it.
-    FieldMeta = namedtuple(
-        "Meta", ["nbytes_file", "start_byte_file", "nbytes_final", "np_dtype"]
+    bit_lengths = np.array([field._bit_length for field in fields], dtype=np.int64)
+    bit_offsets = np.array(
+        [bit_offset[field._name] for field in fields], dtype=np.int64
     )
-    field_meta = {}
-    offset = 0
-    for field in fields:
-        nbytes_file = np.ceil(field._bit_length / 8.0).astype(
-            int
-        )  # the number of bytes the field takes up in the file
-
-        # add a byte from the file if we go over to the next character
-        if (
-            bit_offset[field._name] % 8
-            and bit_offset[field._name] % 8 + field._bit_length > 8
-        ):
-            nbytes_file += 1
-
-        nbytes_final = {3: 4, 5: 8, 6: 8, 7: 8}.get(
-            nbytes_file, nbytes_file
-        )  # JM - the number of actual bytes in memory the variable takes up after all the masking is done
-
-        # JM - this calculation is wrong!  Or I don't know what he meant.
-        # changing this to the start byte of the file assuming we started at 0
-
-        start_byte_file = offset // 8
-        offset += field._bit_length
-
-        # byte_order_symbol is only used to control float types here.
-        #  - uint and int byte order are handled with byteswap later
-        #  - fill is independent of byte order (all 1's)
-        #  - byte order is not applicable to str types
-        byte_order_symbol = "<" if field._byte_order == "little" else ">"
-        np_dtype = {
-            "uint": ">u%d" % nbytes_final,
-            "int": ">i%d" % nbytes_final,
-            "fill": ">u%d" % nbytes_final,
-            "float": "%sf%d" % (byte_order_symbol, nbytes_final),
-            "str": "S%d" % nbytes_final,
-        }[field._data_type]
-
-        #        print ("Adding", field._name, nbytes_file, start_byte_file, nbytes_final, np_dtype)
-        field_meta[field] = FieldMeta(
-            nbytes_file, start_byte_file, nbytes_final, np_dtype
+
+    # the number of bytes each field takes up in the file, adding a byte from
+    # the file if we go over to the next character
+    bits_into_byte = bit_offsets % 8
+    nbytes = (bit_lengths + 7) // 8 + (
+        (bits_into_byte != 0) & (bits_into_byte + bit_lengths > 8)
+    )
+
+    # JM - this calculation is wrong!  Or I don't know what he meant.
+    # changing this to the start byte of the file assuming we started at 0
+    start = (np.cumsum(bit_lengths) - bit_lengths) // 8
+
+    nbytes_final = []
+    for nbytes_file in nbytes.tolist():
+        if nbytes_file < len(_NBYTES_FINAL):
+            nbytes_final.append(_NBYTES_FINAL[nbytes_file])
+        else:
+            nbytes_final.append(nbytes_file)
+
+    field_meta = FieldMeta(
+        start,
+        nbytes,
+        nbytes_final,
+        bit_offsets,
+        bit_lengths,
+        [DATA_TYPE_CODES[field._data_type] for field in fields],
+        counter,
+    )
+
+    # The bits of a field are shifted down from the first byte it spans, a bit
+    # offset past that byte would need a shift the other way.
+    overrun = np.flatnonzero(field_meta.shift < 0)
+    if overrun.size:
+        raise ValueError(
+            "Field {0} has a bit offset of {1}, past the first byte it "
+            "starts in".format(fields[overrun[0]]._name, bit_offsets[overrun[0]])
         )
 
-    return bit_offset, field_meta
+    return field_meta
+
+
+@lru_cache(maxsize=256)
+def _fixed_layout(fields):
+    """Whether the layout of a tuple of fields is the same in packets of any length.
+
+    This is the case when every field has a bit offset, otherwise fields
+    without one are placed from the packet length.
+    """
+
+    return all(field._bit_offset is not None for field in fields)
+
 
+def _layout_nbytes(packet_nbytes, fields):
+    """The packet length the layout of a tuple of fields depends on, or None."""
 
-def _create_byte_arrays(file_bytes, packet_nbytes, field_meta, fields):
+    return None if _fixed_layout(fields) else packet_nbytes
 
-    # Create byte arrays for each field. At the end of this method they are left
-    # as the numpy uint8 type.
-    field_bytes = {}
+
+@lru_cache(maxsize=256)
+def _create_field_meta_cached(layout_nbytes, fields):
+    """Memoized `_create_field_meta`, for a tuple of fields.
+
+    The metadata only depends on the field definitions and, unless every
+    field has a bit offset, on the packet length, so a stream of packets of
+    a few APIDs only builds it once per packet layout. ``layout_nbytes`` is
+    the packet length given by `_layout_nbytes`.
+    """
+
+    return _create_field_meta(layout_nbytes, list(fields))
+
+
+def _check_packet_nbytes(packet_nbytes, field_meta):
+    """Raise if the fields take up more than a packet of the given length."""
+
+    if field_meta.nbits > packet_nbytes * 8:
+        raise RuntimeError(
+            ("Packet definition larger than packet length" " by {} bits").format(
+                field_meta.nbits - (packet_nbytes * 8)
+            )
+        )
+
+
+@lru_cache(maxsize=256)
+def _create_batch_dtype(layout_nbytes, fields):
+    """Build the structured dtype of a batch of decoded packets.
+
+    Parameters
+    ----------
+    layout_nbytes : tuple
+       The packet lengths of the layouts in the batch, as given by
+       `_layout_nbytes`.
+    fields : tuple of ccsdspy.interface.PacketField
+       The fields of the packets.
+
+    Returns
+    -------
+    `numpy.dtype`
+       A structured dtype with one field per distinct field name. Fields
+       spanning more than 8 bytes in any of the layouts are objects.
+    """
+
+    wide = np.zeros(len(fields), dtype=bool)
+    for nbytes in layout_nbytes:
+        field_meta = _create_field_meta_cached(nbytes, fields)
+        wide |= field_meta.nbytes > 8
+
+    # a name repeated in the definition, like a spare field, keeps its
+    # first position and the last field, as with `_decode_packet`
+    dtypes = OrderedDict()
+    for field, is_wide in zip(fields, wide.tolist()):
+        dtypes[field._name] = object if is_wide else _BATCH_DTYPES[field._data_type]
+
+    return np.dtype(list(dtypes.items()))
+
+
+def getSignedNumber(number, bitLength):
+    # Subtract 2**bitLength when the sign bit is set, without branching.
+    # Works on ints and on object arrays of ints alike.
+    number = number & ((1 << bitLength) - 1)
+    sign = (number >> (bitLength - 1)) & 1
+    return number - (sign << bitLength)
+
+
+def _create_packet_decoder(field_meta, fields):
+    """Generate a function decoding one packet of a fixed layout.
+
+    The byte positions, shifts and masks of every field are written into the
+    source of the function as literals, so decoding a packet runs straight
+    line code without looking up any field metadata.
+
+    Parameters
+    ----------
+    field_meta : FieldMeta
+       The metadata of the fields.
+    fields : list of ccsdspy.interface.PacketField
+       The fields of the packet.
+
+    Returns
+    -------
+    function
+       A function taking a NumPy array of uint8 type starting with a packet,
+       and returning an `OrderedDict` mapping field names to values.
+    """
 
     # Note: if only values of field._byte_order are big and little, then dont have to assign, just use the value as-is.
     #      Also, this could be moved into the 'for field in fields' loop but would they
@@ -123,69 +306,136 @@ def _create_byte_arrays(file_bytes, packet_nbytes, field_meta, fields):
     else:
         bigOrLittle = "big"
 
-    for field in fields:
-        meta = field_meta[field]
-
-        # Convert list of bytes into int: list[Nbytes_file bytes] -> python byte format -> int
-        field_bytes[field._name] = int.from_bytes(
-            bytes(
-                file_bytes[
-                    meta.start_byte_file : meta.start_byte_file + meta.nbytes_file
-                ]
-            ),
-            bigOrLittle,
+    width = int(np.max(field_meta.start + field_meta.nbytes))
+    lines = [
+        "def decode_packet(file_bytes):",
+        "    data = file_bytes[:{0}].tobytes()".format(width),
+        "    if len(data) < {0}:".format(width),
+        "        data += bytes({0} - len(data))".format(width),
+    ]
+
+    for j, (field, start, nbytes_file, bit_shift, aligned) in enumerate(
+        zip(
+            fields,
+            field_meta.start.tolist(),
+            field_meta.nbytes.tolist(),
+            field_meta.shift.tolist(),
+            field_meta.aligned.tolist(),
+        )
+    ):
+        # Load the bytes of the field as one integer
+        if nbytes_file > 8:
+            value = "int.from_bytes(data[{0}:{1}], {2!r})".format(
+                start, start + nbytes_file, bigOrLittle
+            )
+        else:
+            terms = []
+            for k in range(nbytes_file):
+                if bigOrLittle == "big":
+                    byte_shift = 8 * (nbytes_file - 1 - k)
+                else:
+                    byte_shift = 8 * k
+                terms.append("data[{0}] << {1}".format(start + k, byte_shift))
+            value = " | ".join(terms) or "0"
+
+        # then switch it to its final type, shifting the field to the bottom
+        # of its bytes and masking off the bits of the fields before it,
+        # unless it fills its bytes exactly
+        if field._data_type in ("int", "uint") and not aligned:
+            value = "(({0}) >> {1}) & {2}".format(
+                value, bit_shift, (1 << field._bit_length) - 1
+            )
+        elif field._data_type == "float":
+            value = "float({0})".format(value)
+        lines.append("    v{0} = {1}".format(j, value))
+
+        if field._data_type == "int":
+            lines.append(
+                "    v{0} -= ((v{0} >> {1}) & 1) << {2}".format(
+                    j, field._bit_length - 1, field._bit_length
+                )
+            )
+
+    lines.append(
+        "    return OrderedDict([{0}])".format(
+            ", ".join(
+                "({0!r}, v{1})".format(field._name, j) for j, field in enumerate(fields)
+            )
         )
+    )
 
-    return field_bytes
+    namespace = {"OrderedDict": OrderedDict}
+    exec(compile("\n".join(lines), "<pyccsds packet decoder>", "exec"), namespace)
 
+    return namespace["decode_packet"]
 
-def getSignedNumber(number, bitLength):
-    mask = (2 ** bitLength) - 1
-    if number & (1 << (bitLength - 1)):
-        return number | ~mask
-    else:
-        return number & mask
 
+@lru_cache(maxsize=256)
+def _create_packet_decoder_cached(layout_nbytes, fields):
+    """Memoized `_create_packet_decoder`, for a packet layout and a tuple of fields."""
 
-def _process_byte_arrays(field_bytes, bit_offset, field_meta, fields):
+    field_meta = _create_field_meta_cached(layout_nbytes, fields)
 
-    # Switch dtype of byte arrays to the final dtype, and apply masks and shifts
-    # to interpret the correct bits.
-    field_arrays = OrderedDict()
+    return _create_packet_decoder(field_meta, list(fields))
 
-    for field in fields:
-        meta = field_meta[field]
-        #        arr = field_bytes[field]
-        #        arr.dtype = meta.np_dtype
 
-        if field._data_type in ("int", "uint"):
+def _scan_packets(file_bytes, offset=0, max_packets=None):
+    """Find the start and the APID of packets in an array of bytes.
 
-            nbits_file = meta.nbytes_file * 8
-            bit_end1 = bit_offset[field._name] + field._bit_length
-            bit_power = nbits_file - bit_offset[field._name]
-            bit_shift = nbits_file - bit_end1
+    Only the primary header length field is read to walk from one packet
+    to the next, the APIDs are then gathered for all packets at once.
+    Scanning stops at the end of the bytes, or before a packet cut off by
+    it.
 
-            # Use mask on number then shift right.
-            # This should work on any number of bits (as long as ones_bits long enough).
-            # actual_value = bytes-together & ( true mask of bits: bit_offset to bit_offset+bit_length-1 )
+    Parameters
+    ----------
+    file_bytes : array
+       A NumPy array of uint8 type, holding the bytes of the file to scan.
+    offset : int, optional
+       The byte offset of the first packet (default is 0).
+    max_packets : int, optional
+       The number of packets to find at most (default is no limit).
 
-            actual_value = field_bytes[field._name] & (
-                2 ** bit_power - 1 & (0xFFFFFFFF << bit_shift)
-            )
+    Returns
+    -------
+    offsets : array of int
+       The byte offset of the start of each packet.
+    apids : array of int
+       The APID of each packet.
+    end : int
+       The byte offset scanning stopped at. Unless a packet is cut off by
+       the end of the bytes, or `max_packets` were found, it is the size of
+       `file_bytes`.
+    """
 
-            # Shift to the right to get just the masked number (was masked in place and may have trailing 0's)
+    offsets = []
+    while offset + 6 <= file_bytes.size and (
+        max_packets is None or len(offsets) < max_packets
+    ):
+        # can't remember where 7 comes from
+        packet_nbytes = (
+            int(file_bytes[offset + 4]) * 256 + int(file_bytes[offset + 5]) + 7
+        )
+        if offset + packet_nbytes > file_bytes.size:
+            break
 
-            actual_value = actual_value >> bit_shift
-            if field._data_type == "int":
-                actual_value = getSignedNumber(actual_value, field._bit_length)
+        offsets.append(offset)
+        offset += packet_nbytes
 
-        elif field._data_type == "float":
-            actual_value = float(field_bytes[field._name])
-        else:
-            actual_value = field_bytes[field._name]
-        field_arrays[field._name] = actual_value
+    offsets = np.array(offsets, dtype=np.intp)
+    first_bytes = file_bytes[offsets].astype(np.intp)
+    apids = (first_bytes & 0x07) * 256 + file_bytes[offsets + 1]
 
-    return field_arrays
+    return offsets, apids, offset
+
+
+def _as_byte_array(file_bytes):
+    """View bytes, a bytearray or a sequence of ints as a NumPy array of uint8 type."""
+
+    if isinstance(file_bytes, (bytes, bytearray, memoryview)):
+        return np.frombuffer(file_bytes, dtype=np.uint8)
+
+    return np.asarray(file_bytes, dtype=np.uint8)
 
 
 def _decode_packet(file_bytes, fields):
@@ -207,10 +457,236 @@ def _decode_packet(file_bytes, fields):
 
     # Setup a dictionary mapping a bit offset to each field. It is assumed
     # that the `fields` array contains entries for the secondary header.
-    packet_nbytes = file_bytes[4] * 256 + file_bytes[5] + 7
+    file_bytes = _as_byte_array(file_bytes)
+    packet_nbytes = int(file_bytes[4]) * 256 + int(file_bytes[5]) + 7
+
+    fields = tuple(fields)
+    layout_nbytes = _layout_nbytes(packet_nbytes, fields)
+    _check_packet_nbytes(
+        packet_nbytes, _create_field_meta_cached(layout_nbytes, fields)
+    )
+
+    decode_packet = _create_packet_decoder_cached(layout_nbytes, fields)
+    field_arrays = decode_packet(file_bytes)
+
+    return field_arrays
+
+
+def _gather_packets(file_bytes, offsets, width):
+    """Gather ``width`` bytes from each packet offset into one 2-D array.
+
+    Bytes past the end of ``file_bytes`` (the last field of the last packet
+    may be read with a trailing byte) are filled with zeros. Only the
+    gathered bytes are copied, packets evenly spaced through the file are
+    not copied at all.
+    """
+
+    size = file_bytes.size
+
+    if offsets.size > 1:
+        step = int(offsets[1] - offsets[0])
+        end = int(offsets[0]) + offsets.size * step
+        if step >= width and end <= size and np.all(np.diff(offsets) == step):
+            # consecutive packets of the same length, a view of the bytes
+            packets = file_bytes[int(offsets[0]) : end].reshape(offsets.size, step)
+            return packets[:, :width]
+
+    packets = np.empty((offsets.size, width), dtype=np.uint8)
+
+    # windows of the packets that end before the file does
+    inside = offsets <= size - width
+    if size >= width:
+        windows = np.lib.stride_tricks.sliding_window_view(file_bytes, width)
+        packets[inside] = windows[offsets[inside]]
+
+    # then the ones running past its end, from a zero padded copy of its tail
+    if not np.all(inside):
+        tail_start = max(size - width, 0)
+        tail = np.zeros(size - tail_start + width, dtype=np.uint8)
+        tail[: size - tail_start] = file_bytes[tail_start:]
+        windows = np.lib.stride_tricks.sliding_window_view(tail, width)
+        packets[~inside] = windows[offsets[~inside] - tail_start]
+
+    return packets
+
+
+def _load_column(packets, start, nbytes_file, nbytes_final, byte_order):
+    """Load the bytes of one field from every packet as integers.
+
+    ``byte_order`` is 'big' or 'little', the order of the bytes of the field
+    in the packet, as for `int.from_bytes`.
+    """
+
+    column_bytes = packets[:, start : start + nbytes_file]
+
+    if nbytes_file > 8:
+        # wider than any NumPy integer, keep them as Python ints
+        return np.array(
+            [int.from_bytes(row.tobytes(), byte_order) for row in column_bytes],
+            dtype=object,
+        )
+
+    if nbytes_file == nbytes_final:
+        # already a native width, reinterpret the bytes as they are
+        raw = np.ascontiguousarray(column_bytes)
+    elif byte_order == "big":
+        # right-align the bytes in a buffer of a native width and reinterpret
+        raw = np.zeros((packets.shape[0], nbytes_final), dtype=np.uint8)
+        raw[:, nbytes_final - nbytes_file :] = column_bytes
+    else:
+        # the most significant bytes come last, so left-align them instead
+        raw = np.zeros((packets.shape[0], nbytes_final), dtype=np.uint8)
+        raw[:, :nbytes_file] = column_bytes
+
+    # the conversion to native order swaps the bytes of the whole column at once
+    byte_order_symbol = "<" if byte_order == "little" else ">"
+    return raw.view("%su%d" % (byte_order_symbol, nbytes_final))[:, 0].astype(np.uint64)
+
+
+def _sign_extend(values, bit_length):
+    """Interpret the low ``bit_length`` bits of each value as two's complement."""
+
+    if values.dtype == object:
+        return getSignedNumber(values, bit_length)
+
+    unused = np.uint64(64 - bit_length)
+
+    return (values << unused).view(np.int64) >> np.int64(unused)
+
+
+def _process_packet_columns(packets, field_meta, fields):
+
+    # Same as the generated packet decoders, but every operation works on a whole
+    # column of packets at once.
+    field_arrays = OrderedDict()
+
+    # the byte order of the first field applies to the whole packet
+    byte_order = fields[0]._byte_order
+
+    for j, field in enumerate(fields):
+        raw = _load_column(
+            packets,
+            int(field_meta.start[j]),
+            int(field_meta.nbytes[j]),
+            int(field_meta.nbytes_final[j]),
+            byte_order,
+        )
+
+        if field._data_type in ("int", "uint"):
+            bit_shift = field_meta.shift[j]
+            mask = field_meta.mask[j]
+
+            if field_meta.aligned[j]:
+                # the field fills its bytes exactly, there are no bits to drop
+                values = raw
+            elif raw.dtype == object:
+                values = (raw >> int(bit_shift)) & ((1 << field._bit_length) - 1)
+            else:
+                values = (raw >> bit_shift.astype(np.uint64)) & mask
+
+            if field._data_type == "int":
+                values = _sign_extend(values, field._bit_length)
+
+        elif field._data_type == "float":
+            values = raw.astype(np.float64)
+        else:
+            values = raw
+        field_arrays[field._name] = values
+
+    return field_arrays
+
+
+def _process_packets_compiled(file_bytes, offsets, field_meta, fields):
+
+    # Let the compiled kernel extract all fields of all packets in one call.
+    out = np.empty((offsets.size, len(fields)), dtype=np.uint64)
+    decode_batch(
+        file_bytes,
+        offsets,
+        field_meta.start,
+        field_meta.nbytes,
+        field_meta.shift,
+        field_meta.mask,
+        field_meta.bit_length,
+        field_meta.code,
+        out,
+    )
+
+    field_arrays = OrderedDict()
+    for j, field in enumerate(fields):
+        values = out[:, j]
+        if field._data_type == "int":
+            values = values.view(np.int64)
+        elif field._data_type == "float":
+            values = values.astype(np.float64)
+        field_arrays[field._name] = values
+
+    return field_arrays
+
+
+def _decode_packets(file_bytes, offsets, fields):
+    """Decode a batch of packets that share the same APID.
+
+    Parameters
+    ----------
+    file_bytes : array
+       A NumPy array of uint8 type, holding the bytes of the file to decode.
+    offsets : array of int
+       The byte offset of the start of each packet in `file_bytes`.
+    fields : list of ccsdspy.interface.PacketField
+       A list of fields, including the secondary header but excluding the
+       primary header.
+
+    Returns
+    -------
+    data: array
+       A structured NumPy array with one entry per packet, and one field per
+       packet field.
+    """
+
+    fields = tuple(fields)
+    file_bytes = _as_byte_array(file_bytes)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    packet_nbytes = (
+        file_bytes[offsets + 4].astype(np.intp) * 256 + file_bytes[offsets + 5] + 7
+    )
+
+    # The field metadata depends on the packet length unless every field has
+    # a bit offset, so decode each layout seen in this batch in one pass.
+    if offsets.size == 0:
+        layouts = []
+    elif _fixed_layout(fields):
+        layouts = [(None, slice(None))]
+    else:
+        layouts = [
+            (nbytes, np.flatnonzero(packet_nbytes == nbytes))
+            for nbytes in np.unique(packet_nbytes).tolist()
+        ]
+
+    field_arrays = np.empty(
+        offsets.size,
+        dtype=_create_batch_dtype(tuple(nbytes for nbytes, _ in layouts), fields),
+    )
+
+    for nbytes, selected in layouts:
+        field_meta = _create_field_meta_cached(nbytes, fields)
+        _check_packet_nbytes(int(packet_nbytes[selected].min()), field_meta)
+
+        # the kernel accumulates each field into a big-endian uint64
+        if (
+            decode_batch is not None
+            and np.all(field_meta.nbytes <= 8)
+            and fields[0]._byte_order == "big"
+        ):
+            columns = _process_packets_compiled(
+                file_bytes, offsets[selected], field_meta, fields
+            )
+        else:
+            width = int(np.max(field_meta.start + field_meta.nbytes))
+            packets = _gather_packets(file_bytes, offsets[selected], width)
+            columns = _process_packet_columns(packets, field_meta, fields)
 
-    bit_offset, field_meta = _create_field_meta(packet_nbytes, fields)
-    field_bytes = _create_byte_arrays(file_bytes, packet_nbytes, field_meta, fields)
-    field_arrays = _process_byte_arrays(field_bytes, bit_offset, field_meta, fields)
+        for name, values in columns.items():
+            field_arrays[name][selected] = values
 
     return field_arrays
@@ -2,9 +2,62 @@
 
 __author__ = "Joey Mukherjee <joey@swri.org>"
 
+import os
+from collections import OrderedDict
+
 import numpy as np
 
-from .decode import _decode_packet
+from .decode import _decode_packet, _decode_packets, _scan_packets
+
+# The number of packets ParseMultiplePackets.read_iter decodes at a time.
+_READ_ITER_CHUNK = 65536
+
+
+def _read_file_bytes(file):
+    """Get the bytes of a file as a NumPy array of uint8 type.
+
+    Parameters
+    ----------
+    file: str
+        Path to a file on the local file system or a file-like object.
+
+    Returns
+    -------
+    array
+        The bytes of the file. Files given by path are memory-mapped, so
+        decoding is backed by the page cache rather than a copy in memory.
+    """
+
+    if not isinstance(file, (str, os.PathLike)):
+        return np.frombuffer(file.read(), dtype="u1")
+    elif os.path.getsize(file) == 0:
+        # an empty file cannot be memory-mapped
+        return np.zeros(0, dtype="u1")
+    else:
+        return np.memmap(file, dtype="u1", mode="r")
+
+
+def _check_scan_end(file_bytes, end):
+    """Raise if scanning for packets stopped before the end of the file.
+
+    Parameters
+    ----------
+    file_bytes: array
+        The bytes of the file.
+    end: int
+        The byte offset scanning stopped at.
+
+    Raises
+    ------
+    ValueError
+        If the packet at `end` is cut off by the end of the file.
+    """
+
+    if end < file_bytes.size:
+        raise ValueError(
+            "ERROR - the packet at byte {end} is cut off by the end of the "
+            "file!".format(end=end)
+        )
 
 
 class PacketField(object):
@@ -25,6 +78,10 @@ class PacketField(object):
         The byte order of the field
     """
 
+    # Fields are looked up in the inner loops of the decoder, and they hash
+    # by identity so they can key the field metadata cache.
+    __slots__ = ("_name", "_data_type", "_bit_length", "_bit_offset", "_byte_order")
+
     def __init__(self, name, data_type, bit_length, bit_offset=None, byte_order="big"):
         """
         Definition of a field contained in a packet.
@@ -103,7 +160,7 @@ class PacketField(object):
             attributes.
         """
 
-        values = {k: repr(v) for (k, v) in self.__dict__.items()}
+        values = {k: repr(getattr(self, k)) for k in self.__slots__}
 
         return (
             "PacketField(name={_name}, data_type={_data_type}, "
@@ -145,6 +202,8 @@ class Packet(object):
         The packets being collected and ordered by name.
     """
 
+    __slots__ = ("_packets",)
+
     def __init__(self, packets):
         """
         Defines a list of packets.
@@ -176,6 +235,28 @@ class Packet(object):
 
         return field_arrays
 
+    def read_many(self, file_bytes, offsets):
+        """
+        Decodes many packets of this definition from an array of bytes at once.
+
+        Parameters
+        ----------
+        file_bytes: array
+            A NumPy array of uint8 type read from a file or a file-like object.
+        offsets: array of int
+            The byte offset of the start of each packet in `file_bytes`.
+
+        Returns
+        -------
+        data: array
+            A structured NumPy array with one entry per packet in the order of
+            `offsets`, and one field per packet field, e.g. ``data["HDR_APID"]``.
+        """
+
+        field_arrays = _decode_packets(file_bytes, offsets, self._packets)
+
+        return field_arrays
+
 
 class ParseMultiplePackets(object):
     """
@@ -192,12 +273,21 @@ class ParseMultiplePackets(object):
         The list of packets associated with the given ID.
     _apid_lookup : str
         The ID that is associated with the packets.
-    _ccsds_header : Packet class
-        The packet definition of the CCSDS header.
     _file_bytes : str
         An array of bytes read from a file or a string.
-    _offset : int
-        The offset into the array of bytes read from a file or a string.
+    _offsets : array of int
+        The offset of each packet into the array of bytes.
+    _apids : array of int
+        The APID of each packet.
+    _end : int
+        The byte offset of the end of the last whole packet.
+    _rows : array of int
+        The position of each packet among the packets of its APID.
+    _decoded : dict
+        The decoded packets of each known APID as a structured NumPy array,
+        keyed by APID.
+    _index : int
+        The index of the next packet to return.
     """
 
     def __init__(self, packets, apid_lookup):
@@ -213,68 +303,6 @@ class ParseMultiplePackets(object):
         self._packets = packets
         self._apid_lookup = apid_lookup
 
-        self._ccsds_header = Packet(
-            [
-                PacketField(
-                    name="HDR_VER", data_type="uint", bit_offset=0, bit_length=3
-                ),
-                PacketField(
-                    name="HDR_TYPE", data_type="uint", bit_offset=3, bit_length=1
-                ),
-                PacketField(
-                    name="HDR_SHDR", data_type="uint", bit_offset=4, bit_length=1
-                ),
-                PacketField(
-                    name="HDR_APID", data_type="uint", bit_offset=5, bit_length=11
-                ),
-                PacketField(
-                    name="HDR_GRP", data_type="uint", bit_offset=0, bit_length=2
-                ),
-                PacketField(
-                    name="HDR_SEQ", data_type="uint", bit_offset=2, bit_length=14
-                ),
-                PacketField(
-                    name="HDR_LEN", data_type="uint", bit_offset=0, bit_length=16
-                ),
-                PacketField(
-                    name="HDR_SPARE", data_type="fill", bit_offset=0, bit_length=1
-                ),
-                PacketField(
-                    name="HDR_RT_PB", data_type="fill", bit_offset=1, bit_length=1
-                ),
-                PacketField(
-                    name="HDR_FLASH_PAGE", data_type="uint", bit_offset=2, bit_length=6
-                ),
-                PacketField(
-                    name="HDR_FLASH_BLOCK",
-                    data_type="uint",
-                    bit_offset=0,
-                    bit_length=14,
-                ),
-                PacketField(
-                    name="HDR_TIME_VALID", data_type="uint", bit_offset=6, bit_length=1
-                ),
-                PacketField(
-                    name="HDR_YEAR", data_type="uint", bit_offset=7, bit_length=11
-                ),
-                PacketField(
-                    name="HDR_DAY", data_type="uint", bit_offset=2, bit_length=9
-                ),
-                PacketField(
-                    name="HDR_HOUR", data_type="uint", bit_offset=3, bit_length=5
-                ),
-                PacketField(
-                    name="HDR_MIN", data_type="uint", bit_offset=0, bit_length=6
-                ),
-                PacketField(
-                    name="HDR_SEC", data_type="uint", bit_offset=6, bit_length=6
-                ),
-                PacketField(
-                    name="HDR_USEC", data_type="uint", bit_offset=4, bit_length=20
-                ),
-            ]
-        )
-
     def start_over(self):
         """Reset the system and start anew.
 
@@ -283,8 +311,83 @@ class ParseMultiplePackets(object):
         No parameters defined.
         """
 
-        self._offset = 0
         self._file_bytes = None
+        self._offsets = None
+        self._apids = None
+        self._end = None
+        self._rows = None
+        self._decoded = {}
+        self._index = 0
+
+    def _which_packet(self, apid):
+        """Look up the name of the packet of an APID.
+
+        Parameters
+        ----------
+        apid : int
+            The APID of the packet.
+
+        Returns
+        -------
+        str
+            The name of the packet based on the APIDs/lookup table passed in.
+
+        Raises
+        ------
+        TypeError
+            If the APID is unknown.
+        """
+
+        try:
+            return self._apid_lookup[apid]
+        except IndexError:
+            # if we got a HDR_APID we don't understand, code will simply raise an
+            # Exception for the caller to catch.  Initial comments said the code
+            # should error out gracefully by returning None but that is not what
+            # the code actually does.
+
+            raise TypeError("ERROR - unknown APID {apid}!".format(apid=apid))
+
+    def _decode_by_apid(self, file_bytes, offsets, apids):
+        """Decode packets, all packets of each APID at once.
+
+        Parameters
+        ----------
+        file_bytes : array
+            A NumPy array of uint8 type, holding the bytes of the file.
+        offsets : array of int
+            The offset of each packet into `file_bytes`.
+        apids : array of int
+            The APID of each packet.
+
+        Returns
+        -------
+        decoded : dict
+            The decoded packets of each known APID as a structured NumPy
+            array, keyed by APID.
+        rows : array of int
+            The position of each packet among the packets of its APID.
+        """
+
+        decoded = {}
+        rows = np.empty_like(offsets)
+
+        order = np.argsort(apids, kind="stable")
+        unique_apids, starts = np.unique(apids[order], return_index=True)
+
+        for apid, group in zip(unique_apids.tolist(), np.split(order, starts[1:])):
+            try:
+                which_packet = self._apid_lookup[apid]
+            except (IndexError, KeyError):
+                # the caller raises when it gets to a packet of this APID
+                continue
+
+            decoded[apid] = self._packets[which_packet].read_many(
+                file_bytes, offsets[group]
+            )
+            rows[group] = np.arange(group.size)
+
+        return decoded, rows
 
     def read_one(self, file):
         """Decode a file-like object containing a sequence of these packets.
@@ -307,48 +410,115 @@ class ParseMultiplePackets(object):
         ------
         TypeError
             If one of the APIDs being processed is unknown.
+        ValueError
+            If the last packet of the file is cut off.
         """
 
         # First time parsing the input file / string?
         # If so, get all the packets.
 
         if self._file_bytes is None:
-            if isinstance(file, str):
-                self._file_bytes = np.fromstring(file.read(), "u1")
-            else:
-                self._file_bytes = np.fromfile(file, "u1")
+            self._file_bytes = _read_file_bytes(file)
+            self._offsets, self._apids, self._end = _scan_packets(self._file_bytes)
+            self._decoded, self._rows = self._decode_by_apid(
+                self._file_bytes, self._offsets, self._apids
+            )
 
-        field_arrays = None
+        # Haven't returned all the packets yet?
 
-        # Haven't finished parsing the whole array of bytes?
+        if self._index < self._offsets.size:
+            apid = int(self._apids[self._index])
+            which_packet = self._which_packet(apid)
 
-        if self._offset < self._file_bytes.size:
+            # as Python values, like Packet.read_one
+            record = self._decoded[apid][self._rows[self._index]]
+            field_arrays = OrderedDict(zip(record.dtype.names, record.item()))
 
-            # Read one header packet.
+            self._index += 1
+            return {"type": which_packet, "data": field_arrays}
+        else:
+            _check_scan_end(self._file_bytes, self._end)
+            return None
 
-            header_field_arrays = self._ccsds_header.read_one(
-                self._file_bytes[self._offset :]
-            )
-            try:
-                which_packet = self._apid_lookup[header_field_arrays["HDR_APID"]]
-            except IndexError:
-                # if we got a HDR_APID we don't understand, code will simply raise an
-                # Exception for the caller to catch.  Initial comments said the code
-                # should error out gracefully by returning None but that is not what
-                # the code actually does.
-
-                raise TypeError(
-                    "ERROR - unknown APID {apid}!".format(
-                        apid=header_field_arrays["HDR_APID"]
-                    )
+    def read_iter(self, file):
+        """Iterate over the packets of a file without decoding it all at once.
+
+        Packets are found and decoded in chunks of consecutive packets, so
+        memory use does not grow with the size of the file. Files given by path are
+        memory-mapped rather than read.
+
+        Parameters
+        ----------
+        file: str
+            Path to a file on the local file system or a file-like object.
+
+        Yields
+        ------
+        type : str
+            The name of the packet based on the APIDs/lookup table passed in.
+        data : `OrderedDict`
+            A dictionary mapping field names to NumPy arrays.
+
+        Raises
+        ------
+        TypeError
+            If one of the APIDs being processed is unknown.
+        ValueError
+            If the last packet of the file is cut off, once the packets
+            before it were yielded.
+        """
+
+        file_bytes = _read_file_bytes(file)
+
+        offset = 0
+        while offset < file_bytes.size:
+            offsets, apids, offset = _scan_packets(file_bytes, offset, _READ_ITER_CHUNK)
+            if offsets.size == 0:
+                # the next packet is cut off by the end of the file
+                _check_scan_end(file_bytes, offset)
+
+            decoded, rows = self._decode_by_apid(file_bytes, offsets, apids)
+
+            # as Python values, like Packet.read_one
+            records = {apid: values.tolist() for apid, values in decoded.items()}
+
+            for apid, row in zip(apids.tolist(), rows.tolist()):
+                which_packet = self._which_packet(apid)
+                field_arrays = OrderedDict(
+                    zip(decoded[apid].dtype.names, records[apid][row])
                 )
+                yield {"type": which_packet, "data": field_arrays}
 
-            field_arrays = self._packets[which_packet].read_one(
-                self._file_bytes[self._offset :]
-            )
+    def read_all_by_apid(self, file):
+        """Decode a whole file into one array per field for each APID.
 
-            # can't remember where 7 comes from
-            self._offset = self._offset + header_field_arrays["HDR_LEN"] + 7
-            return {"type": which_packet, "data": field_arrays}
-        else:
-            return None
+        Parameters
+        ----------
+        file: str
+            Path to a file on the local file system or a file-like object.
+
+        Returns
+        -------
+        data : dict
+            A dictionary mapping each APID in the file to a structured NumPy
+            array with one entry per packet of that APID in file order, and
+            one field per packet field.
+
+        Raises
+        ------
+        TypeError
+            If one of the APIDs being processed is unknown.
+        ValueError
+            If the last packet of the file is cut off.
+        """
+
+        file_bytes = _read_file_bytes(file)
+        offsets, apids, end = _scan_packets(file_bytes)
+        _check_scan_end(file_bytes, end)
+
+        for apid in np.unique(apids).tolist():
+            self._which_packet(apid)
+
+        decoded, _ = self._decode_by_apid(file_bytes, offsets, apids)
+
+        return decoded
@@ -0,0 +1,11 @@
+from pyccsds._fast import decode_batch
+import pytest
+
+@pytest.fixture(params=[decode_batch, None], ids=['kernel', 'numpy'])
+def kernel(request, monkeypatch):
+
+    # Run the batch decoder with the compiled kernel, if there is one, and
+    # with plain NumPy.
+    monkeypatch.setattr('pyccsds.decode.decode_batch', request.param)
+
+    return request.param
@@ -1,5 +1,6 @@
-from src.pyccsds.interface import Packet, PacketField
+from pyccsds.interface import Packet, PacketField
 import numpy as np
+import pytest
 
 def test_Packet():
 
@@ -16,3 +17,211 @@ def test_Packet():
     print_fields = new_packet._packets
     for fields in print_fields:
         print (repr(fields))
+
+def test_PacketReadMany(kernel):
+
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_VER', data_type='uint', bit_offset=0, bit_length=3))
+    my_fields.append (PacketField(name='HDR_TYPE', data_type='uint', bit_offset=3, bit_length=1))
+    my_fields.append (PacketField(name='HDR_SHDR', data_type='uint', bit_offset=4, bit_length=1))
+    my_fields.append (PacketField(name='HDR_APID', data_type='uint', bit_offset=5, bit_length=11))
+    my_fields.append (PacketField(name='HDR_SEQ', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='SIGNED', data_type='int', bit_offset=0, bit_length=12))
+    my_fields.append (PacketField(name='NIBBLE', data_type='uint', bit_offset=4, bit_length=4))
+    my_fields.append (PacketField(name='WORD', data_type='uint', bit_offset=0, bit_length=32))
+
+    new_packet = Packet (my_fields)
+
+    # three 12 byte packets: 6 byte header then 6 bytes of body
+    file_bytes = np.array([
+        0x08, 0x05, 0x00, 0x00, 0x00, 0x05, 0xff, 0xe3, 0x12, 0x34, 0x56, 0x78,
+        0x08, 0x05, 0x00, 0x01, 0x00, 0x05, 0x7f, 0xf1, 0x00, 0x00, 0x00, 0x01,
+        0x08, 0x05, 0x00, 0x02, 0x00, 0x05, 0x00, 0x1f, 0xff, 0xff, 0xff, 0xff,
+    ], dtype='u1')
+    offsets = [0, 12, 24]
+
+    data = new_packet.read_many(file_bytes, offsets)
+
+    assert list(data['HDR_APID']) == [5, 5, 5]
+    assert list(data['HDR_SEQ']) == [0, 1, 2]
+    assert list(data['SIGNED']) == [-2, 2047, 1]
+    assert list(data['NIBBLE']) == [3, 1, 15]
+    assert list(data['WORD']) == [0x12345678, 1, 0xffffffff]
+
+    for i, offset in enumerate(offsets):
+        one = new_packet.read_one(file_bytes[offset:])
+        for name in data.dtype.names:
+            assert data[name][i] == one[name]
+
+def test_PacketReadOneWideField(kernel):
+
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_ID', data_type='uint', bit_offset=0, bit_length=32))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='WIDE', data_type='uint', bit_offset=0, bit_length=40))
+
+    new_packet = Packet (my_fields)
+
+    file_bytes = np.array([0x08, 0x05, 0x00, 0x00, 0x00, 0x04,
+                           0x12, 0x34, 0x56, 0x78, 0x9a], dtype='u1')
+
+    # bits above the low 32 used to be masked away
+    assert new_packet.read_one(file_bytes)['WIDE'] == 0x123456789a
+    assert new_packet.read_many(file_bytes, [0])['WIDE'][0] == 0x123456789a
+
+    # wider than 64 bits and not byte aligned
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_ID', data_type='uint', bit_offset=0, bit_length=32))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='NIBBLE', data_type='uint', bit_offset=0, bit_length=4))
+    my_fields.append (PacketField(name='WIDE', data_type='uint', bit_offset=4, bit_length=68))
+    my_fields.append (PacketField(name='SIGNED', data_type='int', bit_offset=0, bit_length=72))
+
+    new_packet = Packet (my_fields)
+
+    file_bytes = np.array([0x08, 0x05, 0x00, 0x00, 0x00, 0x11,
+                           0xab, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08,
+                           0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff], dtype='u1')
+
+    one = new_packet.read_one(file_bytes)
+    data = new_packet.read_many(file_bytes, [0])
+    assert one['WIDE'] == data['WIDE'][0] == 0xb0102030405060708
+    assert one['SIGNED'] == data['SIGNED'][0] == -1
+
+def test_PacketReadOneBytes():
+
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_ID', data_type='uint', bit_offset=0, bit_length=32))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='VALUE', data_type='int', bit_offset=0, bit_length=8))
+
+    new_packet = Packet (my_fields)
+
+    packet = [0x08, 0x05, 0x00, 0x00, 0x00, 0x00, 0xfe]
+
+    for file_bytes in (bytes(packet), bytearray(packet), packet):
+        assert new_packet.read_one(file_bytes)['VALUE'] == -2
+        assert list(new_packet.read_many(file_bytes, [0])['VALUE']) == [-2]
+
+def test_PacketReadManyLittleEndian(kernel):
+
+    # the byte order of the first field applies to the whole packet
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_ID', data_type='uint', bit_offset=0, bit_length=32, byte_order='little'))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='NIBBLE', data_type='uint', bit_offset=0, bit_length=4))
+    my_fields.append (PacketField(name='SIGNED', data_type='int', bit_offset=4, bit_length=20))
+    my_fields.append (PacketField(name='WIDE', data_type='uint', bit_offset=0, bit_length=72))
+
+    new_packet = Packet (my_fields)
+
+    file_bytes = np.array([
+        0x08, 0x05, 0x00, 0x00, 0x00, 0x0b, 0xab, 0xcd, 0xef,
+        0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09,
+        0x08, 0x05, 0x00, 0x01, 0x00, 0x0b, 0x12, 0x34, 0x56,
+        0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff, 0xff,
+    ], dtype='u1')
+    offsets = [0, 18]
+
+    data = new_packet.read_many(file_bytes, offsets)
+
+    assert list(data['HDR_LEN']) == [0x0b00, 0x0b00]
+
+    for i, offset in enumerate(offsets):
+        one = new_packet.read_one(file_bytes[offset:])
+        for name in data.dtype.names:
+            assert data[name][i] == one[name]
+
+def test_PacketReadManyCython(monkeypatch):
+
+    # only when the optional extension was built
+    cython_kernel = pytest.importorskip('pyccsds._decode_batch').decode_batch
+
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_VER', data_type='uint', bit_offset=0, bit_length=3))
+    my_fields.append (PacketField(name='HDR_APID', data_type='uint', bit_offset=3, bit_length=13))
+    my_fields.append (PacketField(name='HDR_SEQ', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='SIGNED', data_type='int', bit_offset=0, bit_length=12))
+    my_fields.append (PacketField(name='TRIPLE', data_type='uint', bit_offset=4, bit_length=20))
+    my_fields.append (PacketField(name='FLOAT', data_type='float', bit_offset=0, bit_length=32))
+    my_fields.append (PacketField(name='LONG', data_type='int', bit_offset=0, bit_length=64))
+    my_fields.append (PacketField(name='FILL', data_type='fill', bit_offset=0, bit_length=8))
+
+    new_packet = Packet (my_fields)
+
+    # 50 packets of 24 bytes, random but for the length field
+    file_bytes = np.random.default_rng(0).integers(0, 256, size=(50, 24), dtype='u1')
+    file_bytes[:, 4:6] = [0x00, 0x11]
+    file_bytes = file_bytes.ravel()
+    offsets = np.arange(0, file_bytes.size, 24)
+
+    monkeypatch.setattr('pyccsds.decode.decode_batch', None)
+    expected = new_packet.read_many(file_bytes, offsets)
+
+    monkeypatch.setattr('pyccsds.decode.decode_batch', cython_kernel)
+    data = new_packet.read_many(file_bytes, offsets)
+
+    for name in expected.dtype.names:
+        assert list(data[name]) == list(expected[name])
+
+def test_PacketRepeatedFieldName(kernel):
+
+    # spare fields often share a name, the last one wins
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_ID', data_type='uint', bit_offset=0, bit_length=32))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16))
+    my_fields.append (PacketField(name='SPARE', data_type='fill', bit_offset=0, bit_length=4))
+    my_fields.append (PacketField(name='VALUE', data_type='uint', bit_offset=4, bit_length=4))
+    my_fields.append (PacketField(name='SPARE', data_type='fill', bit_offset=0, bit_length=8))
+
+    new_packet = Packet (my_fields)
+
+    file_bytes = np.array([0x08, 0x05, 0x00, 0x00, 0x00, 0x01, 0xab, 0xcd], dtype='u1')
+
+    one = new_packet.read_one(file_bytes)
+    data = new_packet.read_many(file_bytes, [0])
+
+    assert list(one) == list(data.dtype.names) == ['HDR_ID', 'HDR_LEN', 'SPARE', 'VALUE']
+    assert one['VALUE'] == data['VALUE'][0] == 0xb
+    assert one['SPARE'] == data['SPARE'][0] == 0xcd
+
+def test_PacketBitOffsetPastFirstByte(kernel):
+
+    # without bit offsets, they count from the start of the packet
+    my_fields = []
+    my_fields.append (PacketField(name='HDR_ID', data_type='uint', bit_length=32))
+    my_fields.append (PacketField(name='HDR_LEN', data_type='uint', bit_length=16))
+    my_fields.append (PacketField(name='A', data_type='uint', bit_length=4))
+    my_fields.append (PacketField(name='B', data_type='uint', bit_length=4))
+
+    new_packet = Packet (my_fields)
+
+    file_bytes = np.array([0x08, 0x05, 0x00, 0x00, 0x00, 0x00, 0xab], dtype='u1')
+
+    with pytest.raises(ValueError):
+        new_packet.read_one(file_bytes)
+    with pytest.raises(ValueError):
+        new_packet.read_many(file_bytes, [0])
+
+def test_PacketVariableLength(kernel):
+
+    new_packet = Packet ([PacketField(name='PACKET', data_type='uint', bit_offset=0, bit_length=64)])
+
+    # packets of 8, 9 and 7 bytes share one layout, but the last one is too
+    # short for it
+    file_bytes = np.array([
+        0x08, 0x05, 0x00, 0x00, 0x00, 0x01, 0x12, 0x34,
+        0x08, 0x05, 0x00, 0x01, 0x00, 0x02, 0x56, 0x78, 0x00,
+        0x08, 0x05, 0x00, 0x02, 0x00, 0x00, 0x9a,
+    ], dtype='u1')
+
+    assert new_packet.read_one(file_bytes)['PACKET'] == 0x0805000000011234
+    assert new_packet.read_one(file_bytes[8:])['PACKET'] == 0x0805000100025678
+    assert list(new_packet.read_many(file_bytes, [0, 8])['PACKET']) == [0x0805000000011234, 0x0805000100025678]
+
+    with pytest.raises(RuntimeError):
+        new_packet.read_one(file_bytes[17:])
+    with pytest.raises(RuntimeError):
+        new_packet.read_many(file_bytes, [0, 8, 17])
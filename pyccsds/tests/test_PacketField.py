@@ -32,3 +32,10 @@ def test_PacketFieldBadValueDataTypeArgument():
 def test_PacketFieldBadValueByteOrderArgumentCaseSensitive():
 
     new_obj = PacketField(name='HDR_VER', data_type='uint', bit_offset=0, bit_length=3, byte_order = 'BIG')
+
+def test_PacketFieldRepr():
+
+    new_obj = PacketField(name='HDR_VER', data_type='uint', bit_offset=0, bit_length=3)
+    assert repr(new_obj) == ("PacketField(name='HDR_VER', data_type='uint', "
+                             "bit_length=3, bit_offset=0, byte_order='big')")
+    assert not hasattr(new_obj, '__dict__')
@@ -0,0 +1,196 @@
+from pyccsds.interface import Packet, PacketField, ParseMultiplePackets
+import io
+import numpy as np
+import pytest
+
+def make_packets():
+
+    header = [
+        PacketField(name='HDR_VER', data_type='uint', bit_offset=0, bit_length=3),
+        PacketField(name='HDR_TYPE', data_type='uint', bit_offset=3, bit_length=1),
+        PacketField(name='HDR_SHDR', data_type='uint', bit_offset=4, bit_length=1),
+        PacketField(name='HDR_APID', data_type='uint', bit_offset=5, bit_length=11),
+        PacketField(name='HDR_SEQ', data_type='uint', bit_offset=0, bit_length=16),
+        PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16),
+    ]
+    packets = {
+        'short': Packet(header + [PacketField(name='VALUE', data_type='int', bit_offset=0, bit_length=8)]),
+        'long': Packet(header + [PacketField(name='COUNT', data_type='uint', bit_offset=0, bit_length=24)]),
+    }
+    apid_lookup = {1: 'short', 2: 'long'}
+
+    return packets, apid_lookup
+
+def write_file(tmp_path, file_bytes):
+
+    path = tmp_path / 'packets.bin'
+    path.write_bytes(bytes(file_bytes))
+
+    return path
+
+def test_ParseMultiplePacketsReadOne(tmp_path, kernel):
+
+    path = write_file(tmp_path, [
+        0x08, 0x01, 0x00, 0x00, 0x00, 0x00, 0xfe,
+        0x08, 0x02, 0x00, 0x01, 0x00, 0x02, 0x01, 0x02, 0x03,
+        0x08, 0x01, 0x00, 0x02, 0x00, 0x00, 0x05,
+    ])
+    packets, apid_lookup = make_packets()
+
+    parser = ParseMultiplePackets(packets, apid_lookup)
+    parser.start_over()
+
+    results = []
+    with open(path, 'rb') as file:
+        while True:
+            result = parser.read_one(file)
+            if result is None:
+                break
+            results.append(result)
+
+    assert [result['type'] for result in results] == ['short', 'long', 'short']
+    assert [result['data']['HDR_SEQ'] for result in results] == [0, 1, 2]
+    assert results[0]['data']['VALUE'] == -2
+    assert results[1]['data']['COUNT'] == 0x010203
+    assert results[2]['data']['VALUE'] == 5
+
+    # Python ints, so a zero length doesn't wrap around
+    assert type(results[0]['data']['HDR_LEN']) is int
+    assert results[0]['data']['HDR_LEN'] - 1 == -1
+
+def test_ParseMultiplePacketsUnknownAPID(tmp_path):
+
+    path = write_file(tmp_path, [
+        0x08, 0x01, 0x00, 0x00, 0x00, 0x00, 0xfe,
+        0x08, 0x07, 0x00, 0x01, 0x00, 0x00, 0x00,
+    ])
+    packets, _ = make_packets()
+
+    # a list lookup, indexed by APID
+    parser = ParseMultiplePackets(packets, ['long', 'short'])
+    parser.start_over()
+
+    with open(path, 'rb') as file:
+        assert parser.read_one(file)['type'] == 'short'
+        with pytest.raises(TypeError):
+            parser.read_one(file)
+
+def test_ParseMultiplePacketsReadOnePathAndBuffer(tmp_path, kernel):
+
+    file_bytes = [
+        0x08, 0x02, 0x00, 0x00, 0x00, 0x02, 0x01, 0x02, 0x03,
+        0x08, 0x01, 0x00, 0x01, 0x00, 0x00, 0x7f,
+    ]
+    path = write_file(tmp_path, file_bytes)
+    packets, apid_lookup = make_packets()
+
+    for file in (str(path), path, io.BytesIO(bytes(file_bytes))):
+        parser = ParseMultiplePackets(packets, apid_lookup)
+        parser.start_over()
+
+        assert parser.read_one(file)['data']['COUNT'] == 0x010203
+        assert parser.read_one(file)['data']['VALUE'] == 127
+        assert parser.read_one(file) is None
+
+def test_ParseMultiplePacketsReadIter(tmp_path, kernel, monkeypatch):
+
+    path = write_file(tmp_path, [
+        0x08, 0x01, 0x00, 0x00, 0x00, 0x00, 0xfe,
+        0x08, 0x02, 0x00, 0x01, 0x00, 0x02, 0x01, 0x02, 0x03,
+        0x08, 0x01, 0x00, 0x02, 0x00, 0x00, 0x05,
+    ])
+    packets, apid_lookup = make_packets()
+
+    parser = ParseMultiplePackets(packets, apid_lookup)
+    results = list(parser.read_iter(str(path)))
+
+    assert [result['type'] for result in results] == ['short', 'long', 'short']
+    assert [result['data']['HDR_SEQ'] for result in results] == [0, 1, 2]
+    assert results[1]['data']['COUNT'] == 0x010203
+    assert type(results[0]['data']['HDR_LEN']) is int
+    assert results[0]['data']['HDR_LEN'] - 1 == -1
+
+    # packets are found and decoded a chunk at a time
+    monkeypatch.setattr('pyccsds.interface._READ_ITER_CHUNK', 2)
+    assert list(parser.read_iter(str(path))) == results
+
+def test_ParseMultiplePacketsReadAllByAPID(tmp_path, kernel):
+
+    path = write_file(tmp_path, [
+        0x08, 0x01, 0x00, 0x00, 0x00, 0x00, 0xfe,
+        0x08, 0x02, 0x00, 0x01, 0x00, 0x02, 0x01, 0x02, 0x03,
+        0x08, 0x01, 0x00, 0x02, 0x00, 0x00, 0x05,
+    ])
+    packets, apid_lookup = make_packets()
+
+    parser = ParseMultiplePackets(packets, apid_lookup)
+    data = parser.read_all_by_apid(str(path))
+
+    assert sorted(data) == [1, 2]
+    assert list(data[1]['HDR_SEQ']) == [0, 2]
+    assert list(data[1]['VALUE']) == [-2, 5]
+    assert list(data[2]['COUNT']) == [0x010203]
+
+def test_ParseMultiplePacketsLittleEndian(tmp_path, kernel):
+
+    file_bytes = [
+        0x08, 0x01, 0x00, 0x00, 0x00, 0x01, 0x34, 0x12,
+    ]
+    path = write_file(tmp_path, file_bytes)
+    packet = Packet([
+        PacketField(name='HDR_ID', data_type='uint', bit_offset=0, bit_length=32, byte_order='little'),
+        PacketField(name='HDR_LEN', data_type='uint', bit_offset=0, bit_length=16),
+        PacketField(name='VALUE', data_type='uint', bit_offset=0, bit_length=16),
+    ])
+
+    parser = ParseMultiplePackets({'little': packet}, {1: 'little'})
+    parser.start_over()
+
+    data = parser.read_one(str(path))['data']
+    one = packet.read_one(np.array(file_bytes, dtype='u1'))
+
+    assert data['HDR_LEN'] == one['HDR_LEN'] == 0x0100
+    assert data['VALUE'] == one['VALUE'] == 0x1234
+
+def test_ParseMultiplePacketsReadOneCutOff(tmp_path, kernel):
+
+    packets, apid_lookup = make_packets()
+
+    # the header of the last packet is cut off, then its body
+    for tail in ([0x08, 0x01, 0x00], [0x08, 0x02, 0x00, 0x03, 0x00, 0x02, 0x01]):
+        path = write_file(tmp_path, [
+            0x08, 0x01, 0x00, 0x00, 0x00, 0x00, 0xfe,
+            0x08, 0x02, 0x00, 0x01, 0x00, 0x02, 0x01, 0x02, 0x03,
+        ] + tail)
+
+        parser = ParseMultiplePackets(packets, apid_lookup)
+        parser.start_over()
+
+        assert parser.read_one(str(path))['data']['VALUE'] == -2
+        assert parser.read_one(str(path))['data']['COUNT'] == 0x010203
+        with pytest.raises(ValueError):
+            parser.read_one(str(path))
+
+        with pytest.raises(ValueError):
+            parser.read_all_by_apid(str(path))
+
+def test_ParseMultiplePacketsReadIterCutOff(tmp_path, kernel, monkeypatch):
+
+    path = write_file(tmp_path, [
+        0x08, 0x01, 0x00, 0x00, 0x00, 0x00, 0xfe,
+        0x08, 0x02, 0x00, 0x01, 0x00, 0x02, 0x01, 0x02, 0x03,
+        0x08, 0x01, 0x00, 0x02, 0x00, 0x00, 0x05,
+        0x08, 0x01, 0x00,
+    ])
+    packets, apid_lookup = make_packets()
+
+    parser = ParseMultiplePackets(packets, apid_lookup)
+
+    # every packet before the cut off one is yielded, whatever the chunks
+    for chunk in (2, 65536):
+        monkeypatch.setattr('pyccsds.interface._READ_ITER_CHUNK', chunk)
+        results = []
+        with pytest.raises(ValueError):
+            for result in parser.read_iter(str(path)):
+                results.append(result)
+        assert [result['data']['HDR_SEQ'] for result in results] == [0, 1, 2]
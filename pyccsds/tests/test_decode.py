@@ -0,0 +1,32 @@
+from pyccsds.decode import _gather_packets, getSignedNumber
+import numpy as np
+
+def test_getSignedNumber():
+
+    assert getSignedNumber(0x7ff, 12) == 2047
+    assert getSignedNumber(0x800, 12) == -2048
+    assert getSignedNumber(0xffe, 12) == -2
+    assert getSignedNumber(0x1ffe, 12) == -2
+    assert getSignedNumber(2 ** 72 - 1, 72) == -1
+
+def test_getSignedNumberObjectArray():
+
+    values = np.array([0x7f, 0x80, 0xff, 2 ** 71], dtype=object)
+
+    assert list(getSignedNumber(values, 8)) == [127, -128, -1, 0]
+    assert list(getSignedNumber(values, 72)) == [0x7f, 0x80, 0xff, -2 ** 71]
+    assert values[2] == 0xff
+
+def test_gather_packets():
+
+    file_bytes = np.arange(1, 31, dtype='u1')
+
+    def expected(offsets, width):
+        padded = np.concatenate([file_bytes, np.zeros(width, dtype='u1')])
+        return np.array([padded[offset:offset + width] for offset in offsets])
+
+    # evenly spaced, out of order, and running past the end of the bytes
+    for offsets in ([0, 10, 20], [20, 0, 10, 10], [3, 27, 29], [0, 10, 25]):
+        offsets = np.array(offsets)
+        for width in (1, 4, 10, 40):
+            assert np.array_equal(_gather_packets(file_bytes, offsets, width), expected(offsets, width))
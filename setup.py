@@ -4,7 +4,7 @@
 import os
 from itertools import chain
 
-from setuptools import setup
+from setuptools import Extension, setup
 from setuptools.config import read_configuration
 
 ################################################################################
@@ -21,6 +21,25 @@ ex_extras = dict(filter(lambda i: i[0] not in exclude_keys, extras.items()))
 # Concatenate all the values together for 'all'
 extras["all"] = list(chain.from_iterable(ex_extras.values()))
 
+################################################################################
+# Optional compiled decoding kernel, pyccsds falls back to numba or NumPy
+# when it is not built.
+################################################################################
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize(
+        [
+            Extension(
+                "pyccsds._decode_batch",
+                [os.path.join("pyccsds", "_decode_batch.pyx")],
+                optional=True,
+            )
+        ]
+    )
+
 ################################################################################
 # Version configuration and setup call
 ################################################################################
@@ -38,6 +57,7 @@ except Exception:
 
 setup(
     extras_require=extras,
+    ext_modules=ext_modules,
     use_scm_version={
         "write_to": os.path.join("pyccsds", "version.py"),
         "write_to_template": VERSION_TEMPLATE,